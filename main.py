@@ -3,12 +3,21 @@
 # Downloads TIGER 2020 data, builds a boundary from user input,
 # and clips counties + state-level primary/secondary roads to that boundary.
 
+import hashlib
+import json
 import os
+import shutil
 import zipfile
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import requests
 import geopandas as gpd
+import pyogrio
+import shapely
+from requests.adapters import HTTPAdapter
 
 # ---------------------------------
 # CONFIGURATION
@@ -25,83 +34,290 @@ LAYER_URLS = {
 PROJECT_FOLDER = "GIS_Project_Starter"
 DOWNLOAD_FOLDER = os.path.join(PROJECT_FOLDER, "downloads")
 CLIPPED_FOLDER = os.path.join(PROJECT_FOLDER, "clipped")
+CACHE_FOLDER = os.path.join(PROJECT_FOLDER, "cache")
+STATE_FIPS_CACHE = os.path.join(DOWNLOAD_FOLDER, "state_fips.json")
+
+# Parallel downloads (I/O bound, so threads are fine)
+DOWNLOAD_WORKERS = 4
+UNZIP_WORKERS = 2
+HTTP_POOL_SIZE = 8
+RANGE_PARTS = 4  # parallel byte-range connections for large ZIPs
+COPY_BUFFER = 1 << 20  # 1 MB read/write buffer for downloads and unzip
+
+# Shapefile parts we actually read; TIGER's .xml metadata sidecars are skipped
+SHAPEFILE_EXTS = {".shp", ".shx", ".dbf", ".prj", ".cpg"}
+
+# Parallel clipping (Shapely 2 releases the GIL inside GEOS)
+CLIP_WORKERS = os.cpu_count() or 1
+CLIP_MIN_CHUNK = 500  # border features; fewer than this are intersected in one go
 
 # Ensures directories exist
 os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
 os.makedirs(CLIPPED_FOLDER, exist_ok=True)
+os.makedirs(CACHE_FOLDER, exist_ok=True)
 
 
 # ---------------------------------
 # HELPER FUNCTIONS
 # ---------------------------------
 
-def download_zip(name: str, url: str) -> str:
-    """Download a ZIP file to downloads/<name>.zip, unless it already exists."""
-    local_path = os.path.join(DOWNLOAD_FOLDER, f"{name}.zip")
+def make_session() -> requests.Session:
+    """Return a requests Session with a connection pool shared by download threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def download_layer(
+    name: str,
+    url: str,
+    session: requests.Session,
+    io_pool: ThreadPoolExecutor,
+    ranged: bool = False,
+) -> Future:
+    """Download downloads/<name>.zip on io_pool. The Future resolves to the ZIP path."""
+    download = download_zip_ranged if ranged else download_zip
+    zip_path = os.path.join(DOWNLOAD_FOLDER, f"{name}.zip")
+
+    def run() -> str:
+        # Avoids redownloading
+        if os.path.exists(zip_path):
+            print(f"{name}: ZIP already exists, skipping download.")
+        else:
+            download(name, url, session, zip_path)
+        return zip_path
+
+    return io_pool.submit(run)
+
+
+def unzip_layer(name: str, zip_future: Future, cpu_pool: ThreadPoolExecutor) -> Future:
+    """
+    Unzip on cpu_pool as soon as zip_future's download lands.
+    The Future resolves to the layer path. cpu_pool tasks only wait on io_pool
+    downloads, never the other way round, so the two pools cannot deadlock.
+    """
+    return cpu_pool.submit(lambda: unzip_zip(name, zip_future.result()))
+
 
-    # Avoids redownloading
-    if os.path.exists(local_path):
-        print(f"{name}: ZIP already exists, skipping download.")
-        return local_path
+def fetch_layer(
+    name: str,
+    url: str,
+    session: requests.Session,
+    io_pool: ThreadPoolExecutor,
+    cpu_pool: ThreadPoolExecutor,
+    ranged: bool = False,
+) -> Future:
+    """Download then unzip a layer; returns a Future for the layer path."""
+    return unzip_layer(name, download_layer(name, url, session, io_pool, ranged), cpu_pool)
 
+
+def download_zip(name: str, url: str, session: requests.Session, local_path: str) -> None:
+    """Download a ZIP file to local_path in a single stream."""
     print(f"Downloading {name} from {url} ...")
-    resp = requests.get(url, stream=True)
+    resp = session.get(url, stream=True)
     resp.raise_for_status() # stops program if request fails
 
-    with open(local_path, "wb") as f:
-        for chunk in resp.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
+    # Content-Length is the encoded size, so only trust it for unencoded bodies
+    total = 0
+    if "Content-Encoding" not in resp.headers:
+        total = int(resp.headers.get("Content-Length", "0"))
+
+    # Write to a temp file so a failed download never looks complete
+    part_path = f"{local_path}.part"
 
+    # Copy the raw socket stream in 1 MB blocks instead of many small chunks
+    resp.raw.decode_content = True
+    with open(part_path, "wb", buffering=COPY_BUFFER) as f:
+        preallocate(f, total)
+        shutil.copyfileobj(resp.raw, f, length=COPY_BUFFER)
+        f.truncate()  # drop any unused preallocated tail
+
+    os.replace(part_path, local_path)
     print(f"{name}: downloaded to {local_path}")
-    return local_path
+
+
+def download_zip_ranged(
+    name: str,
+    url: str,
+    session: requests.Session,
+    local_path: str,
+    parts: int = RANGE_PARTS,
+) -> None:
+    """
+    Download a large ZIP to local_path over several parallel HTTP byte-range
+    requests. Falls back to download_zip if the server does not support ranges.
+    """
+    head = session.head(url, allow_redirects=True)
+    head.raise_for_status()
+    total = int(head.headers.get("Content-Length", "0"))
+
+    if head.headers.get("Accept-Ranges", "").lower() != "bytes" or total < parts:
+        download_zip(name, url, session, local_path)
+        return
+
+    print(f"Downloading {name} from {url} in {parts} parts ...")
+
+    # Split into `parts` contiguous inclusive byte ranges
+    ranges = [(i * total // parts, (i + 1) * total // parts - 1) for i in range(parts)]
+
+    part_path = f"{local_path}.part"
+    with open(part_path, "wb") as f:
+        preallocate(f, total)
+
+    with ThreadPoolExecutor(max_workers=parts) as ex:
+        ok = all(ex.map(lambda r: fetch_range(url, session, part_path, *r), ranges))
+
+    if not ok:
+        # Server answered 200 (or short) instead of 206: use the single-stream path
+        os.remove(part_path)
+        download_zip(name, url, session, local_path)
+        return
+
+    os.replace(part_path, local_path)
+    print(f"{name}: downloaded to {local_path}")
+
+
+def preallocate(f, size: int) -> None:
+    """Reserve size bytes for an open file up front, so large downloads are not extended piecemeal."""
+    if size <= 0:
+        return
+    if hasattr(os, "posix_fallocate"):
+        os.posix_fallocate(f.fileno(), 0, size)
+    else:
+        # Windows/macOS: no fallocate, but setting the length still sizes the file once
+        f.truncate(size)
+
+
+def fetch_range(url: str, session: requests.Session, path: str, lo: int, hi: int) -> bool:
+    """Fetch bytes lo..hi of url into path at offset lo. Returns False if not a 206."""
+    with session.get(url, headers={"Range": f"bytes={lo}-{hi}"}, stream=True) as resp:
+        resp.raise_for_status()
+        if resp.status_code != 206:
+            return False
+
+        # Each worker uses its own handle, so seek + write is safe across threads
+        with open(path, "r+b", buffering=COPY_BUFFER) as f:
+            f.seek(lo)
+            shutil.copyfileobj(resp.raw, f, length=COPY_BUFFER)
+            written = f.tell() - lo
+
+    return written == hi - lo + 1
 
 
 def unzip_zip(name: str, zip_path: str) -> str:
-    """Unzip ZIP into downloads/<name>/ and return the first .shp path."""
+    """
+    Unzip ZIP into downloads/<name>/, convert its shapefile once to
+    downloads/<name>.gpkg, remove the extracted files, and return the GeoPackage
+    path. Later runs reuse the .gpkg.
+    """
+    gpkg_path = os.path.join(DOWNLOAD_FOLDER, f"{name}.gpkg")
+    if os.path.exists(gpkg_path):
+        print(f"{name}: GeoPackage already exists, skipping unzip.")
+        return gpkg_path
+
     extract_folder = os.path.join(DOWNLOAD_FOLDER, name)
     os.makedirs(extract_folder, exist_ok=True)
 
     print(f"Unzipping {zip_path} to {extract_folder} ...")
     with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(extract_folder)
+        for zi in zf.infolist():
+            ext = os.path.splitext(zi.filename)[1].lower()
+            if zi.is_dir() or ext not in SHAPEFILE_EXTS:
+                continue
+            # TIGER ZIPs are flat, so extract by base name only
+            dst = os.path.join(extract_folder, os.path.basename(zi.filename))
+            with zf.open(zi) as src, open(dst, "wb") as dst_f:
+                shutil.copyfileobj(src, dst_f, COPY_BUFFER)
     print(f"{name}: unzip complete.")
 
     shp_path = find_shapefile(extract_folder)
     if not shp_path:
         raise FileNotFoundError(f"No .shp found in {extract_folder} for {name}")
 
-    print(f"{name}: using shapefile {shp_path}")
-    return shp_path
+    convert_to_gpkg(shp_path, gpkg_path)
+
+    # The GeoPackage is all later steps read, so drop the extracted shapefile
+    shutil.rmtree(extract_folder)
+
+    print(f"{name}: using GeoPackage {gpkg_path}")
+    return gpkg_path
+
+
+def convert_to_gpkg(shp_path: str, gpkg_path: str) -> None:
+    """
+    Convert a shapefile to a GeoPackage with an R*Tree spatial index, so later
+    bbox and attribute reads are indexed SQLite queries.
+    """
+    print(f"  converting {shp_path} to {gpkg_path} ...")
+    # Write under a temp name so an interrupted conversion is never reused
+    tmp_path = os.path.splitext(gpkg_path)[0] + ".tmp.gpkg"
+    pyogrio.write_dataframe(
+        pyogrio.read_dataframe(shp_path),
+        tmp_path,
+        layer=Path(shp_path).stem,
+        driver="GPKG",
+        spatial_index=True,
+    )
+    os.replace(tmp_path, gpkg_path)
 
 
 def find_shapefile(folder: str) -> str | None:
-    """Return the first .shp file found in folder (recursive), or None."""
-    for root, _, files in os.walk(folder):
-        for f in files:
-            if f.lower().endswith(".shp"):
-                return os.path.join(root, f)
-    return None
+    """Return the first .shp file in folder, or None. TIGER ZIPs extract flat, so no recursion."""
+    shp = next(iter(Path(folder).glob("*.shp")), None)
+    return str(shp) if shp else None
+
+
+def load_state_fips(states_zip: Future) -> dict[str, str]:
+    """
+    Return a lookup of lowercase state name and uppercase postal code -> STATEFP.
+    Built once from the states attributes and cached to downloads/state_fips.json.
+    `states_zip` is the Future for the states ZIP download. It is only waited on
+    when the JSON cache is missing, and the attributes are then read straight
+    from the ZIP, so the lookup never waits on unzip or GeoPackage conversion.
+    """
+    if os.path.exists(STATE_FIPS_CACHE):
+        try:
+            with open(STATE_FIPS_CACHE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            # Unreadable cache: rebuild it from the states layer
+            print(f"Ignoring unreadable {STATE_FIPS_CACHE}: {e}")
+
+    # Attributes only, read in place from the ZIP; geometries are not needed
+    states_df = pyogrio.read_dataframe(
+        f"/vsizip/{os.path.abspath(states_zip.result())}",
+        columns=["NAME", "STUSPS", "STATEFP"],
+        read_geometry=False,
+    )
+    fips = states_df["STATEFP"].astype(str).str.zfill(2)
+
+    lookup = dict(zip(states_df["NAME"].str.lower(), fips))
+    lookup.update(zip(states_df["STUSPS"].str.upper(), fips))
 
+    # Write to a temp file so an interrupted write never looks complete
+    tmp_path = f"{STATE_FIPS_CACHE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(lookup, f, indent=2)
+    os.replace(tmp_path, STATE_FIPS_CACHE)
+    return lookup
 
-def resolve_state_fips(states_gdf: gpd.GeoDataFrame, user_input: str) -> str:
+
+def resolve_state_fips(fips_lookup: Mapping[str, str], user_input: str) -> str:
     """
-    Given states GeoDataFrame and a user input like 'Texas' or 'TX',
+    Given the state FIPS lookup and a user input like 'Texas' or 'TX',
     return the STATEFP code as a zero-padded string (e.g., '48').
     """
     text = user_input.strip()
 
     # Try full name
-    mask_name = states_gdf["NAME"].str.lower() == text.lower()
-    subset = states_gdf[mask_name]
-    if not subset.empty:
-        return str(subset.iloc[0]["STATEFP"]).zfill(2)
+    if text.lower() in fips_lookup:
+        return fips_lookup[text.lower()]
 
     # Try postal code
-    mask_code = states_gdf["STUSPS"].str.upper() == text.upper()
-    subset = states_gdf[mask_code]
-    if not subset.empty:
-        return str(subset.iloc[0]["STATEFP"]).zfill(2)
+    if text.upper() in fips_lookup:
+        return fips_lookup[text.upper()]
 
     # If neither works
     raise ValueError(
@@ -110,30 +326,45 @@ def resolve_state_fips(states_gdf: gpd.GeoDataFrame, user_input: str) -> str:
     )
 
 
+def dissolve_boundary(subset: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """
+    Merge the selected rows into a single boundary feature with a direct GEOS
+    union instead of a groupby dissolve. Like dissolve(), attributes come from
+    the first row, so the schema is the same however many rows matched.
+    """
+    boundary = subset.iloc[[0]].reset_index(drop=True)
+    if len(subset) == 1:
+        return boundary
+
+    geom = shapely.unary_union(subset.geometry.values)
+    boundary[boundary.geometry.name] = gpd.GeoSeries([geom], crs=subset.crs)
+    return boundary
+
+
 def build_boundary(
     boundary_type: str,
     boundary_value: str,
-    states_shp: str,
-    counties_shp: str,
+    fips_lookup: Mapping[str, str] | None,
+    states_path: str | None,
+    counties_path: str | None,
 ) -> gpd.GeoDataFrame:
     """
     Build a boundary GeoDataFrame for:
-      - state: state name or postal (Texas, TX)
-      - fips:  5-digit county FIPS (e.g., 48113)
+      - state: state name or postal (Texas, TX), reads fips_lookup and states_path
+      - fips:  5-digit county FIPS (e.g., 48113), reads counties_path
     """
     boundary_type = boundary_type.lower().strip()
     boundary_value = boundary_value.strip()
 
     if boundary_type == "state":
-        states = gpd.read_file(states_shp)
-        state_fips = resolve_state_fips(states, boundary_value)
-        # Select and dissolve state boundary
-        boundary = states[states["STATEFP"] == state_fips]
+        state_fips = resolve_state_fips(fips_lookup, boundary_value)
+        # Select and dissolve state boundary (only this state's rows are read)
+        boundary = pyogrio.read_dataframe(states_path, where=f"STATEFP = '{state_fips}'")
 
         if boundary.empty:
             raise ValueError(f"No state found for '{boundary_value}'.")
 
-        boundary = boundary.dissolve().reset_index(drop=True)
+        boundary = dissolve_boundary(boundary)
         print(f"Boundary: state '{boundary_value}' (STATEFP={state_fips}), features: {len(boundary)}")
         return boundary
 
@@ -142,16 +373,24 @@ def build_boundary(
         if len(boundary_value) != 5 or not boundary_value.isdigit():
             raise ValueError("County FIPS must be a 5-digit numeric code, e.g., 48113.")
 
-        counties = gpd.read_file(counties_shp)
-        subset = counties[counties["GEOID"] == boundary_value]
+        # Find the matching feature IDs with an attribute-only GeoPackage query (no geometry parsing)
+        matches = pyogrio.read_dataframe(
+            counties_path,
+            columns=["GEOID"],
+            read_geometry=False,
+            where=f"GEOID = '{boundary_value}'",
+            fid_as_index=True,
+        )
 
-        if subset.empty:
+        if matches.empty:
             raise ValueError(
                 f"No county found with FIPS '{boundary_value}'. "
                 "Use the 5-digit GEOID value."
             )
 
-        boundary = subset.dissolve().reset_index(drop=True)
+        # Then load only those polygons
+        subset = pyogrio.read_dataframe(counties_path, fids=matches.index.to_numpy())
+        boundary = dissolve_boundary(subset)
         print(f"Boundary: county GEOID={boundary_value}, features: {len(boundary)}")
         return boundary
 
@@ -162,25 +401,18 @@ def build_boundary(
 def build_city_boundary(
     city_name: str,
     state_input: str,
-    states_shp: str,
+    fips_lookup: Mapping[str, str],
+    place_path: str,
 ) -> gpd.GeoDataFrame:
     """
     Build a city/place boundary:
       - city_name: e.g., 'Dallas'
       - state_input: state name or code, e.g., 'Texas' or 'TX'
+      - place_path: that state's TIGER PLACE layer (GeoPackage from unzip_zip)
     """
-    states = gpd.read_file(states_shp)
-    state_fips = resolve_state_fips(states, state_input)
+    state_fips = resolve_state_fips(fips_lookup, state_input)
 
-    # Construct PLACE URL for this state
-    place_url = f"{BASE_URL}/PLACE/tl_2020_{state_fips}_place.zip"
-    place_name = f"places_{state_fips}"
-
-    # Download + unzip this state's PLACE file
-    zip_path = download_zip(place_name, place_url)
-    place_shp = unzip_zip(place_name, zip_path)
-
-    places = gpd.read_file(place_shp)
+    places = gpd.read_file(place_path)
 
     # Match city by state and name
     mask_name = places["NAME"].str.lower() == city_name.strip().lower()
@@ -193,7 +425,7 @@ def build_city_boundary(
             f"(STATEFP={state_fips})."
         )
 
-    boundary = subset.dissolve().reset_index(drop=True)
+    boundary = dissolve_boundary(subset)
     print(
         f"Boundary: city '{city_name}' in state '{state_input}' "
         f"(STATEFP={state_fips}), features: {len(boundary)}"
@@ -201,28 +433,161 @@ def build_city_boundary(
     return boundary
 
 
-def clip_layer_to_boundary(
-    layer_shp: str,
+def is_rectangle(geom) -> bool:
+    """True if geom is a single axis-aligned rectangle (e.g., a bbox boundary)."""
+    return (
+        geom.geom_type == "Polygon"
+        and not geom.interiors
+        and len(geom.exterior.coords) == 5
+        and geom.equals(shapely.box(*geom.bounds))
+    )
+
+
+def clip_to_mask(base: gpd.GeoDataFrame, bmask) -> gpd.GeoDataFrame:
+    """
+    Clip base to a single mask geometry. Features wholly inside the mask are kept
+    as-is; only features crossing its edge go through a full intersection,
+    split into chunks on a thread pool. Axis-aligned rectangular masks use
+    GEOS's rectangle clipper instead.
+    """
+    shapely.prepare(bmask)
+
+    # One bulk STRtree query narrows to features that touch the mask at all
+    cand = base.sindex.query(bmask, predicate="intersects")
+    cand.sort()  # keep original feature order
+    clipped = base.iloc[cand].copy()
+
+    if is_rectangle(bmask):
+        geoms = shapely.clip_by_rect(clipped.geometry.to_numpy(), *bmask.bounds)
+        clipped[clipped.geometry.name] = gpd.GeoSeries(geoms, index=clipped.index, crs=base.crs)
+        return clipped[~clipped.geometry.is_empty]
+
+    # One vectorized predicate splits inside vs. border-crossing features
+    # Own copy: worker threads write into it, so it must not alias the frame's storage
+    geoms = np.array(clipped.geometry.values, copy=True)
+    border = (~shapely.contains_properly(bmask, geoms)).nonzero()[0]
+
+    def clip_chunk(idx) -> None:
+        # Chunks hold disjoint positions, so workers never write the same slot
+        geoms[idx] = shapely.intersection(geoms[idx], bmask)
+
+    # Balance only the expensive border intersections across workers
+    size = max(CLIP_MIN_CHUNK, -(-len(border) // CLIP_WORKERS))
+    chunks = [border[i:i + size] for i in range(0, len(border), size)]
+    with ThreadPoolExecutor(max_workers=CLIP_WORKERS) as ex:
+        list(ex.map(clip_chunk, chunks))
+
+    clipped[clipped.geometry.name] = gpd.GeoSeries(geoms, index=clipped.index, crs=base.crs)
+    return clipped[~clipped.geometry.is_empty]
+
+
+def project_boundary(
     boundary_gdf: gpd.GeoDataFrame,
-    output_path: str,
-) -> None:
-    """Clip a TIGER layer to a polygon boundary, then enforce single geometry type."""
-    print(f"Clipping {layer_shp} ...")
-    base = gpd.read_file(layer_shp)
-    print(f"  {layer_shp}: {len(base)} features before clip")
+    layer_path: str,
+    boundary_by_crs: dict,
+) -> gpd.GeoDataFrame:
+    """
+    Return the boundary in layer_path's CRS. Reprojections are cached in
+    boundary_by_crs, so layers sharing a CRS (all of TIGER is EPSG:4269) reuse one.
+    """
+    # Read the layer CRS from the header only, without loading features
+    layer_crs = pyogrio.read_info(layer_path)["crs"]
 
     # CRS must match or clip will be wrong
-    if base.crs is None or boundary_gdf.crs is None:
+    if layer_crs is None or boundary_gdf.crs is None:
         raise ValueError("CRS missing on base or boundary")
 
-    # Align CRS if needed
-    if base.crs != boundary_gdf.crs:
-        boundary = boundary_gdf.to_crs(base.crs)
+    if layer_crs not in boundary_by_crs:
+        # Align CRS if needed
+        if boundary_gdf.crs != layer_crs:
+            boundary_by_crs[layer_crs] = boundary_gdf.to_crs(layer_crs)
+        else:
+            boundary_by_crs[layer_crs] = boundary_gdf
+    return boundary_by_crs[layer_crs]
+
+
+def cache_path(
+    layer: str,
+    boundary_type: str,
+    boundary_value: str,
+    keep_cols: list[str] | None = None,
+) -> str:
+    """
+    Return cache/<key>.parquet, keyed on the layer, the boundary it was built for,
+    and the attribute columns kept (so a different column list is a cache miss).
+    """
+    cols = ",".join(sorted(keep_cols)) if keep_cols is not None else "*"
+    key = hashlib.sha1(f"{layer}|{boundary_type}|{boundary_value}|{cols}".encode()).hexdigest()[:12]
+    return os.path.join(CACHE_FOLDER, f"{key}.parquet")
+
+
+def read_cache(cache_file: str | None) -> gpd.GeoDataFrame | None:
+    """Return the cached GeoParquet, or None if it is missing or unreadable."""
+    if not cache_file or not os.path.exists(cache_file):
+        return None
+    try:
+        return gpd.read_parquet(cache_file)
+    except (OSError, ValueError) as e:
+        # Treat a damaged cache as a miss so it gets rebuilt
+        print(f"Ignoring unreadable cache {cache_file}: {e}")
+        return None
+
+
+def write_cache(gdf: gpd.GeoDataFrame, cache_file: str) -> None:
+    """Write a GeoParquet cache via a temp file so an interrupted write never looks complete."""
+    tmp_path = f"{cache_file}.tmp"
+    gdf.to_parquet(tmp_path)
+    os.replace(tmp_path, cache_file)
+
+
+def clip_layer_to_boundary(
+    layer_path: str,
+    boundary: gpd.GeoDataFrame,
+    output_path: str,
+    cache_file: str | None = None,
+    keep_cols: list[str] | None = None,
+) -> None:
+    """
+    Clip a TIGER layer to a polygon boundary, then enforce single geometry type.
+    The boundary must already be in the layer's CRS (see project_boundary).
+    If cache_file exists, the clip is skipped and the cached GeoParquet is used.
+    keep_cols limits the attribute columns carried through (geometry is always kept).
+    """
+    print(f"Clipping {layer_path} ...")
+
+    clipped = read_cache(cache_file)
+    if clipped is not None:
+        print(f"  {output_path}: {len(clipped)} features loaded from cache {cache_file}")
     else:
-        boundary = boundary_gdf
+        clipped = clip_layer(layer_path, boundary, output_path, keep_cols)
+        if cache_file:
+            write_cache(clipped, cache_file)
+
+    # Save output
+    Path(os.path.dirname(output_path)).mkdir(parents=True, exist_ok=True)
+    clipped.to_file(output_path, driver="GPKG", engine="pyogrio")
+    print(f"Saved clipped file: {output_path}")
+
+
+def clip_layer(
+    layer_path: str,
+    boundary: gpd.GeoDataFrame,
+    output_path: str,
+    keep_cols: list[str] | None = None,
+) -> gpd.GeoDataFrame:
+    """Read and clip a layer to the boundary, keeping only the layer's geometry family."""
+    # Let GDAL skip features outside the boundary's bounding box (and unused columns)
+    base = pyogrio.read_dataframe(layer_path, bbox=tuple(boundary.total_bounds), columns=keep_cols)
+    if keep_cols is not None:
+        base = base[keep_cols + [base.geometry.name]]
+    print(f"  {layer_path}: {len(base)} features in boundary bbox before clip")
+
+    if base.crs != boundary.crs:
+        raise ValueError(f"Boundary CRS {boundary.crs} does not match layer CRS {base.crs}")
 
     # Actual clip
-    clipped = gpd.clip(base, boundary)
+    bmask = shapely.unary_union(boundary.geometry.values)
+    clipped = clip_to_mask(base, bmask)
     print(f"  {output_path}: {len(clipped)} features after clip (before geometry filter)")
 
     # Decide what geometry family to keep based on base layer
@@ -242,11 +607,7 @@ def clip_layer_to_boundary(
 
     clipped = clipped[clipped.geometry.type.isin(allowed)].copy()
     print(f"  {output_path}: {len(clipped)} features after filtering to {allowed}")
-
-    # Save output
-    Path(os.path.dirname(output_path)).mkdir(parents=True, exist_ok=True)
-    clipped.to_file(output_path)
-    print(f"Saved clipped file: {output_path}")
+    return clipped
 
 
 # ---------------------------------
@@ -277,63 +638,122 @@ def main() -> None:
     else:
         raise ValueError("Invalid choice. Use 'state', 'city', or 'fips' (or 1/2/3).")
 
-    # Step 1: Download + unzip national states, counties
-    states_zip = download_zip("states", LAYER_URLS["states"])
-    states_shp = unzip_zip("states", states_zip)
-
-    counties_zip = download_zip("counties", LAYER_URLS["counties"])
-    counties_shp = unzip_zip("counties", counties_zip)
-
-    # Step 2: determine STATEFP for roads (PRISECROADS)
-    states_gdf = gpd.read_file(states_shp)
-
-    if mode == "state":
-        state_fips = resolve_state_fips(states_gdf, state_input)
-    elif mode == "city":
-        state_fips = resolve_state_fips(states_gdf, city_state)
-    else:  # mode == "fips"
-        # First 2 digits of county GEOID = state FIPS
-        state_fips = fips_value[:2]
-
-    prisec_name = f"prisecroads_{state_fips}"
-    prisec_url = f"{BASE_URL}/PRISECROADS/tl_2020_{state_fips}_prisecroads.zip"
-    roads_zip = download_zip(prisec_name, prisec_url)
-    roads_shp = unzip_zip(prisec_name, roads_zip)
-
-    # Step 3: Build boundary
-    if mode == "city":
-        boundary = build_city_boundary(city_name, city_state, states_shp)
-        boundary_type = "city"
-        boundary_value = city_name
-        boundary.to_file(os.path.join(CLIPPED_FOLDER, "city_boundary.shp"))
-
-    elif mode == "state":
-        boundary = build_boundary("state", state_input, states_shp, counties_shp)
-        boundary_type = "state"
-        boundary_value = state_input
-    else:  # mode == "fips"
-        boundary = build_boundary("fips", fips_value, states_shp, counties_shp)
-        boundary_type = "fips"
-        boundary_value = fips_value
-
-    # Optional: debug boundary
-    # boundary.to_file(os.path.join(CLIPPED_FOLDER, "boundary_debug.shp"))
-
-    print(f"\nUsing boundary type: {boundary_type}, value: {boundary_value}")
-    print(f"Using state FIPS {state_fips} for PRISECROADS\n")
-
-    # Step 4: Clip roads + counties
-    print("Clipping layers to boundary...\n")
-
-    try:
-        clip_layer_to_boundary(roads_shp, boundary, os.path.join(CLIPPED_FOLDER, "roads_clipped.shp"))
-    except Exception as e:
-        print(f"Error clipping roads: {e}")
+    session = make_session()
+
+    # Downloads run on io_pool and each finished ZIP is unzipped on cpu_pool,
+    # so the boundary can be built while the roads ZIP is still downloading.
+    # cpu_pool is the outer context so io_pool's downloads drain first, letting
+    # unzip tasks that wait on them finish.
+    with (
+        ThreadPoolExecutor(max_workers=UNZIP_WORKERS) as cpu_pool,
+        ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as io_pool,
+    ):
+
+        # Step 1: Start national states, counties
+        states_zip = download_layer("states", LAYER_URLS["states"], session, io_pool)
+        states = unzip_layer("states", states_zip, cpu_pool)
+        counties = fetch_layer("counties", LAYER_URLS["counties"], session, io_pool, cpu_pool)
+
+        # Step 2: determine STATEFP for roads (PRISECROADS)
+        # The lookup needs at most the states ZIP, not its unzip/conversion
+        if mode == "state":
+            fips_lookup = load_state_fips(states_zip)
+            state_fips = resolve_state_fips(fips_lookup, state_input)
+        elif mode == "city":
+            fips_lookup = load_state_fips(states_zip)
+            state_fips = resolve_state_fips(fips_lookup, city_state)
+        else:  # mode == "fips"
+            # First 2 digits of county GEOID = state FIPS; no lookup needed,
+            # so roads starts downloading right away
+            fips_lookup = None
+            state_fips = fips_value[:2]
+
+        # Roads is the largest per-state payload, so split it across connections
+        prisec_name = f"prisecroads_{state_fips}"
+        prisec_url = f"{BASE_URL}/PRISECROADS/tl_2020_{state_fips}_prisecroads.zip"
+        roads = fetch_layer(prisec_name, prisec_url, session, io_pool, cpu_pool, ranged=True)
+
+        # City mode also needs this state's PLACE file, so fetch it alongside roads
+        if mode == "city":
+            place_name = f"places_{state_fips}"
+            place_url = f"{BASE_URL}/PLACE/tl_2020_{state_fips}_place.zip"
+            places = fetch_layer(place_name, place_url, session, io_pool, cpu_pool)
+
+        # Step 3: Build boundary
+        if mode == "city":
+            boundary_type = "city"
+            boundary_value = city_name
+            cache_value = f"{state_fips}|{city_name.lower()}"
+        elif mode == "state":
+            boundary_type = "state"
+            boundary_value = state_input
+            cache_value = state_fips  # 'Texas' and 'TX' share a cache entry
+        else:  # mode == "fips"
+            boundary_type = "fips"
+            boundary_value = fips_value
+            cache_value = fips_value
+
+        boundary_cache = cache_path("boundary", boundary_type, cache_value)
+        boundary = read_cache(boundary_cache)
+        if boundary is not None:
+            print(f"Boundary: loaded from cache {boundary_cache}")
+        else:
+            if mode == "city":
+                boundary = build_city_boundary(city_name, city_state, fips_lookup, places.result())
+            elif mode == "state":
+                boundary = build_boundary(mode, boundary_value, fips_lookup, states.result(), None)
+            else:  # mode == "fips"
+                boundary = build_boundary(mode, boundary_value, fips_lookup, None, counties.result())
+            write_cache(boundary, boundary_cache)
+
+        if mode == "city":
+            boundary.to_file(
+                os.path.join(CLIPPED_FOLDER, "city_boundary.gpkg"), driver="GPKG", engine="pyogrio"
+            )
 
-    try:
-        clip_layer_to_boundary(counties_shp, boundary, os.path.join(CLIPPED_FOLDER, "counties_clipped.shp"))
-    except Exception as e:
-        print(f"Error clipping counties: {e}")
+        # Optional: debug boundary
+        # boundary.to_file(os.path.join(CLIPPED_FOLDER, "boundary_debug.gpkg"), driver="GPKG")
+
+        print(f"\nUsing boundary type: {boundary_type}, value: {boundary_value}")
+        print(f"Using state FIPS {state_fips} for PRISECROADS\n")
+
+        # Step 4: Clip counties + roads
+        print("Clipping layers to boundary...\n")
+
+        # Reproject the (small) boundary once per distinct layer CRS
+        boundary_by_crs = {}
+
+        counties_cols = ["GEOID", "NAME", "STATEFP"]
+        roads_cols = ["LINEARID", "FULLNAME", "RTTYP", "MTFCC"]
+
+        # Counties first: it is usually ready while roads is still arriving.
+        # Fetch failures are resolved outside the try so they stop the run
+        # rather than being reported as clip errors.
+        counties_path = counties.result()
+        try:
+            counties_boundary = project_boundary(boundary, counties_path, boundary_by_crs)
+            clip_layer_to_boundary(
+                counties_path,
+                counties_boundary,
+                os.path.join(CLIPPED_FOLDER, "counties_clipped.gpkg"),
+                cache_path("counties", boundary_type, cache_value, counties_cols),
+                keep_cols=counties_cols,
+            )
+        except Exception as e:
+            print(f"Error clipping counties: {e}")
+
+        roads_path = roads.result()
+        try:
+            roads_boundary = project_boundary(boundary, roads_path, boundary_by_crs)
+            clip_layer_to_boundary(
+                roads_path,
+                roads_boundary,
+                os.path.join(CLIPPED_FOLDER, "roads_clipped.gpkg"),
+                cache_path(prisec_name, boundary_type, cache_value, roads_cols),
+                keep_cols=roads_cols,
+            )
+        except Exception as e:
+            print(f"Error clipping roads: {e}")
 
     print("\nAll done.")
     print(f"Clipped outputs saved in: {os.path.abspath(CLIPPED_FOLDER)}")